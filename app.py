@@ -1,68 +1,316 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import delete, event, select, tuple_
+from sqlalchemy.orm import defer
+from sqlalchemy.types import LargeBinary, TypeDecorator
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import base64
+import binascii
 import hashlib
+import itertools
 import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import string
+import struct
+import threading
+import time
 
 app = Flask(__name__)
 
+# Serialize dicts in insertion order; sorting every frequency map's keys on
+# each response is pure overhead.
+app.json.sort_keys = False
+
 # --- Database setup ---
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///strings.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_pre_ping': True
+}
 
 db = SQLAlchemy(app)
 
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside a writer; the rest keeps hot pages in memory
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
 # --- Helper Functions ---
 
+# hashlib is backed by OpenSSL, which already dispatches to the SHA-NI / AVX2
+# code paths at runtime on CPUs that support them.
 def compute_sha256(value: str) -> str:
     return hashlib.sha256(value.encode()).hexdigest()
 
+def hash_batch(values: list) -> list:
+    sha256 = hashlib.sha256
+    return [sha256(v.encode() if isinstance(v, str) else v).hexdigest() for v in values]
+
+# Lowercases A-Z in one translate() pass; everything that isn't alphanumeric is deleted
+_ASCII_LOWER = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ', b'abcdefghijklmnopqrstuvwxyz')
+_ASCII_NON_ALNUM = bytes(b for b in range(128) if not chr(b).isalnum())
+
 def is_palindrome(value: str) -> bool:
-    cleaned = ''.join(c.lower() for c in value if c.isalnum())
+    if value.isascii():
+        cleaned = value.encode('ascii').translate(_ASCII_LOWER, _ASCII_NON_ALNUM)
+    else:
+        cleaned = ''.join(c.lower() for c in value if c.isalnum())
     return cleaned == cleaned[::-1]
 
-def get_character_frequency_map(value: str) -> dict:
-    freq = {}
-    for c in value:
-        freq[c] = freq.get(c, 0) + 1
-    return freq
+# Below this length Counter's setup costs more than counting in a plain loop
+SHORT_STRING_LENGTH = 32
 
+def get_character_frequency_map(value: str) -> dict:
+    if len(value) < SHORT_STRING_LENGTH:
+        freq = {}
+        get = freq.get
+        for c in value:
+            freq[c] = get(c, 0) + 1
+        return freq
+    return dict(Counter(value))
+
+# Bit i is set when chr(ord('a') + i) is present, in either case, which
+# matches SQLite's ASCII case-insensitive LIKE used for other characters
+_LETTER_BITS = {c: 1 << (ord(c.lower()) - 97) for c in string.ascii_letters}
+
+def get_char_mask(chars) -> int:
+    mask = 0
+    get = _LETTER_BITS.get
+    for c in chars:
+        mask |= get(c, 0)
+    return mask
+
+# Everything except the hash, which callers compute up front to check for duplicates.
 def analyze_string(value: str) -> dict:
-    words = value.split()
+    # The frequency map already holds one key per distinct character, so it
+    # doubles as the unique-character count instead of building a separate set.
+    freq = get_character_frequency_map(value)
     return {
         "length": len(value),
         "is_palindrome": is_palindrome(value),
-        "unique_characters": len(set(value)),
-        "word_count": len(words),
-        "sha256_hash": compute_sha256(value),
-        "character_frequency_map": get_character_frequency_map(value)
+        "unique_characters": len(freq),
+        "word_count": len(value.split()),
+        "character_frequency_map": freq,
+        "char_mask": get_char_mask(freq)
     }
 
+# Strings at least this long are analyzed in a worker process; below it, pickling
+# the value across costs more than analyzing it in the request thread.
+OFFLOAD_THRESHOLD = 64 * 1024
+
+# Kept small because every gunicorn worker gets its own pool. It's created on
+# first use, so workers forked from a preloading server each build their own
+# queues, and its processes start via forkserver (spawn where that's unavailable)
+# rather than forking this multithreaded process with its SQLite connections.
+ANALYZE_POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+_start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+_analyze_pool = None
+_analyze_pool_lock = threading.Lock()
+
+def get_analyze_pool() -> ProcessPoolExecutor:
+    global _analyze_pool
+    with _analyze_pool_lock:
+        if _analyze_pool is None:
+            _analyze_pool = ProcessPoolExecutor(
+                max_workers=ANALYZE_POOL_WORKERS,
+                mp_context=multiprocessing.get_context(_start_method)
+            )
+        return _analyze_pool
+
+def analyze_many(values: list) -> list:
+    large = [v for v in values if len(v) >= OFFLOAD_THRESHOLD]
+    offloaded = dict(zip(large, get_analyze_pool().map(analyze_string, large))) if large else {}
+    return [offloaded[v] if v in offloaded else analyze_string(v) for v in values]
+
 # --- Model ---
+class FrequencyMap(TypeDecorator):
+    """Stores a {char: count} map as packed little-endian (codepoint, count) uint32 pairs."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        flat = [n for c, count in value.items() for n in (ord(c), count)]
+        return struct.pack(f'<{len(flat)}I', *flat)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        flat = struct.unpack(f'<{len(value) // 4}I', value)
+        return dict(zip(map(chr, flat[0::2]), flat[1::2]))
+
 class StringRecord(db.Model):
     id = db.Column(db.String(64), primary_key=True)  # SHA-256 hash as ID
     value = db.Column(db.Text, nullable=False)
     length = db.Column(db.Integer, nullable=False)
-    is_palindrome = db.Column(db.Boolean, nullable=False)
+    is_palindrome = db.Column(db.Boolean, nullable=False, index=True)
     unique_characters = db.Column(db.Integer, nullable=False)
-    word_count = db.Column(db.Integer, nullable=False)
-    character_frequency_map = db.Column(db.JSON, nullable=False)
+    word_count = db.Column(db.Integer, nullable=False, index=True)
+    character_frequency_map = db.Column(FrequencyMap, nullable=False)
+    char_mask = db.Column(db.BigInteger, nullable=False)  # See get_char_mask
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "value": self.value,
-            "properties": {
-                "length": self.length,
-                "is_palindrome": self.is_palindrome,
-                "unique_characters": self.unique_characters,
-                "word_count": self.word_count,
-                "sha256_hash": self.id,
-                "character_frequency_map": self.character_frequency_map
-            },
-            "created_at": self.created_at.isoformat() + "Z"
-        }
+    # ix_len_pal leads on length, so it also serves min_length/max_length on their
+    # own; ix_created_id backs the (created_at, id) keyset pagination order
+    __table_args__ = (
+        db.Index('ix_len_pal', 'length', 'is_palindrome'),
+        db.Index('ix_created_id', 'created_at', 'id'),
+    )
+
+    def to_dict(self, include_frequency_map=True):
+        return serialize_record(self, include_frequency_map)
+
+def serialize_record(record, include_frequency_map=True) -> dict:
+    # Works on both StringRecord instances and Core rows of the string_record table
+    properties = {
+        "length": record.length,
+        "is_palindrome": record.is_palindrome,
+        "unique_characters": record.unique_characters,
+        "word_count": record.word_count,
+        "sha256_hash": record.id
+    }
+    if include_frequency_map:
+        properties["character_frequency_map"] = record.character_frequency_map
+    return {
+        "id": record.id,
+        "value": record.value,
+        "properties": properties,
+        "created_at": record.created_at.isoformat() + "Z"
+    }
+
+def build_row(string_id: str, value: str, props: dict) -> dict:
+    return {
+        "id": string_id,
+        "value": value,
+        "length": props["length"],
+        "is_palindrome": props["is_palindrome"],
+        "unique_characters": props["unique_characters"],
+        "word_count": props["word_count"],
+        "character_frequency_map": props["character_frequency_map"],
+        "char_mask": props["char_mask"],
+        "created_at": datetime.utcnow()
+    }
+
+# --- Response cache ---
+
+# Cached GET bodies are dropped on every write in this process and expire after
+# RESPONSE_CACHE_TTL seconds, so writes made by other worker processes show up
+# within that window. Misses aren't cached, so a value created by another worker
+# is found on the next GET. Bodies above RESPONSE_CACHE_MAX_BODY aren't cached
+# either, which caps the cache at RESPONSE_CACHE_SIZE * RESPONSE_CACHE_MAX_BODY
+# (16 MiB) per worker.
+RESPONSE_CACHE_TTL = 5
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_MAX_BODY = 16 * 1024
+
+_cache_versions = itertools.count()
+_cache_version = next(_cache_versions)
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+def invalidate_response_cache():
+    global _cache_version
+    with _response_cache_lock:
+        _cache_version = next(_cache_versions)
+        _response_cache.clear()
+
+def _load_string_json(string_id: str):
+    # Plain Core row; no ORM instance or identity-map bookkeeping for a read-only lookup
+    table = StringRecord.__table__
+    row = db.session.execute(select(table).where(table.c.id == string_id)).first()
+    if row is None:
+        return None
+    data = serialize_record(row)
+    return app.json.dumps(data, separators=(',', ':')) + "\n"
+
+def get_string_json(string_id: str):
+    now = time.monotonic()
+    with _response_cache_lock:
+        entry = _response_cache.get(string_id)
+        if entry is not None:
+            body, stored_at = entry
+            if now - stored_at < RESPONSE_CACHE_TTL:
+                _response_cache.move_to_end(string_id)
+                return body
+            del _response_cache[string_id]
+        version = _cache_version
+
+    body = _load_string_json(string_id)
+    if body is not None and len(body) <= RESPONSE_CACHE_MAX_BODY:
+        with _response_cache_lock:
+            # Skip storing if a write invalidated the cache while we were loading
+            if version == _cache_version:
+                _response_cache[string_id] = (body, now)
+                if len(_response_cache) > RESPONSE_CACHE_SIZE:
+                    _response_cache.popitem(last=False)
+    return body
+
+# --- Listing helpers ---
+
+def contains_character_filter(character: str):
+    # Single ASCII letters are answered from char_mask instead of a LIKE scan
+    if len(character) == 1 and character.isascii() and character.isalpha():
+        return StringRecord.char_mask.op('&')(1 << (ord(character.lower()) - 97)) != 0
+    return StringRecord.value.contains(character)
+
+def wants_frequency_map() -> bool:
+    # List endpoints skip the frequency map unless asked with ?include=frequency_map
+    return 'frequency_map' in request.args.get('include', '').split(',')
+
+def encode_cursor(record) -> str:
+    raw = f"{record.created_at.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    created_at, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), record_id
+
+def stream_records(records, include_frequency_map=True, **extra):
+    """Stream {"data": [...], "count": n, **extra} one row at a time."""
+    def dumps(obj):
+        return app.json.dumps(obj, separators=(',', ':'))
+
+    # Run the query and fetch the first row now, so database errors still turn
+    # into an error response instead of failing after a 200 has been sent
+    rows = iter(records)
+    first = next(rows, None)
+    if first is not None:
+        rows = itertools.chain((first,), rows)
+
+    def generate():
+        count = 0
+        yield '{"data":['
+        for record in rows:
+            if count:
+                yield ','
+            yield dumps(record.to_dict(include_frequency_map))
+            count += 1
+        yield '],"count":' + str(count)
+        for key, value in extra.items():
+            yield ',' + dumps(key) + ':' + dumps(value)
+        yield '}'
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
 
 # --- Routes ---
 @app.route('/')
@@ -90,43 +338,87 @@ def analyze_and_store_string():
     if not isinstance(value, str):
         return jsonify({"error": "'value' must be a string"}), 422
 
-    # Analyze
-    props = analyze_string(value)
-    string_id = props["sha256_hash"]
-
-    # Check if already exists
-    existing = StringRecord.query.get(string_id)
-    if existing:
+    # Check if already exists before doing the rest of the analysis
+    string_id = compute_sha256(value)
+    if db.session.execute(select(1).where(StringRecord.id == string_id)).scalar():
         return jsonify({"error": "String already exists"}), 409
 
-    # Create new record
-    record = StringRecord(
-        id=string_id,
-        value=value,
-        length=props["length"],
-        is_palindrome=props["is_palindrome"],
-        unique_characters=props["unique_characters"],
-        word_count=props["word_count"],
-        character_frequency_map=props["character_frequency_map"]
+    # Analyze and create new record; a concurrent insert of the same value leaves rowcount at 0
+    row = build_row(string_id, value, analyze_many([value])[0])
+    result = db.session.execute(
+        sqlite_insert(StringRecord).values(**row).on_conflict_do_nothing(index_elements=['id'])
     )
-
-    db.session.add(record)
     db.session.commit()
 
+    if result.rowcount == 0:
+        return jsonify({"error": "String already exists"}), 409
+    invalidate_response_cache()
+
+    record = StringRecord(**row)
     return jsonify(record.to_dict()), 201
 
+# --------------------------
+# POST /strings/bulk
+# --------------------------
+MAX_BULK_SIZE = 1000
+
+@app.route('/strings/bulk', methods=['POST'])
+def bulk_analyze_and_store_strings():
+    values = request.get_json()
+
+    if not isinstance(values, list) or not values:
+        return jsonify({"error": "Request body must be a non-empty JSON array of strings"}), 400
+    if len(values) > MAX_BULK_SIZE:
+        return jsonify({"error": f"At most {MAX_BULK_SIZE} strings per request"}), 400
+    if not all(isinstance(value, str) for value in values):
+        return jsonify({"error": "Every value must be a string"}), 422
+
+    # Drop repeats within the batch, then anything already stored
+    values = list(dict.fromkeys(values))
+    string_ids = hash_batch(values)
+    existing = set(db.session.scalars(
+        select(StringRecord.id).where(StringRecord.id.in_(string_ids))
+    ))
+
+    new_values = [(string_id, value) for string_id, value in zip(string_ids, values)
+                  if string_id not in existing]
+    analyses = analyze_many([value for _, value in new_values])
+    rows = [build_row(string_id, value, props)
+            for (string_id, value), props in zip(new_values, analyses)]
+
+    # One statement and one commit for the whole batch; rows lost to a
+    # concurrent insert come back as duplicates rather than created
+    inserted = set()
+    if rows:
+        inserted = set(db.session.scalars(
+            sqlite_insert(StringRecord)
+            .on_conflict_do_nothing(index_elements=['id'])
+            .returning(StringRecord.id),
+            rows
+        ))
+        db.session.commit()
+        if inserted:
+            invalidate_response_cache()
+
+    created = [row for row in rows if row["id"] in inserted]
+    return jsonify({
+        "data": [StringRecord(**row).to_dict() for row in created],
+        "count": len(created),
+        "duplicates": [value for string_id, value in zip(string_ids, values)
+                       if string_id not in inserted]
+    }), 201 if created else 200
+
 # --------------------------
 # GET /strings/{value}
 # --------------------------
 @app.route('/strings/<string_value>', methods=['GET'])
 def get_specific_string(string_value):
-    hash_value = compute_sha256(string_value)
-    record = StringRecord.query.get(hash_value)
+    body = get_string_json(compute_sha256(string_value))
 
-    if not record:
+    if body is None:
         return jsonify({"error": "String not found"}), 404
 
-    return jsonify(record.to_dict()), 200
+    return app.response_class(body, mimetype='application/json'), 200
 
 
 # --------------------------
@@ -161,17 +453,37 @@ def get_all_strings():
     contains_character = request.args.get('contains_character')
     if contains_character:
         filters['contains_character'] = contains_character
-        query = query.filter(StringRecord.value.contains(contains_character))
+        query = query.filter(contains_character_filter(contains_character))
 
-    # Get results
-    records = query.all()
-    data = [r.to_dict() for r in records]
+    include_frequency_map = wants_frequency_map()
+    if not include_frequency_map:
+        query = query.options(defer(StringRecord.character_frequency_map))
 
-    return jsonify({
-        "data": data,
-        "count": len(data),
-        "filters_applied": filters
-    }), 200
+    # Keyset pagination on (created_at, id), only when a limit or cursor is given
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is None and not cursor:
+        return stream_records(query.yield_per(500), include_frequency_map,
+                              filters_applied=filters), 200
+
+    if limit is not None and limit < 1:
+        return jsonify({"error": "'limit' must be a positive integer"}), 400
+
+    query = query.order_by(StringRecord.created_at, StringRecord.id)
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except (ValueError, binascii.Error):
+            return jsonify({"error": "Invalid cursor"}), 400
+        query = query.filter(tuple_(StringRecord.created_at, StringRecord.id) > after)
+
+    records = query.limit(limit).all() if limit is not None else query.all()
+    next_cursor = None
+    if limit is not None and len(records) == limit:
+        next_cursor = encode_cursor(records[-1])
+
+    return stream_records(records, include_frequency_map,
+                          filters_applied=filters, next_cursor=next_cursor), 200
 
 
 # --------------------------
@@ -180,19 +492,27 @@ def get_all_strings():
 @app.route('/strings/<string_value>', methods=['DELETE'])
 def delete_string(string_value):
     hash_value = compute_sha256(string_value)
-    record = StringRecord.query.get(hash_value)
+    result = db.session.execute(delete(StringRecord).where(StringRecord.id == hash_value))
+    db.session.commit()
 
-    if not record:
+    if result.rowcount == 0:
         return jsonify({"error": "String not found"}), 404
 
-    db.session.delete(record)
-    db.session.commit()
+    invalidate_response_cache()
     return '', 204
 
 
 # --------------------------
 # Natural Language Filtering
 # --------------------------
+# One pass over the query picks out every supported phrase
+_NL_QUERY_RE = re.compile(
+    r"(?P<palindrome>palindromic)"
+    r"|(?P<single_word>single word|one word)"
+    r"|longer than\s+(?P<longer_than>\d+)"
+    r"|contain\w*\s+(?:(?:the|a)\s+)?(?:(?:letter|character)\s+)?(?P<character>[a-z])\b"
+)
+
 @app.route('/strings/filter-by-natural-language', methods=['GET'])
 def filter_by_natural_language():
     query_text = request.args.get('query', '')
@@ -204,21 +524,15 @@ def filter_by_natural_language():
     # Very simple keyword-based NLP heuristic
     q = query_text.lower()
 
-    if "palindromic" in q:
-        parsed_filters["is_palindrome"] = True
-    if "single word" in q or "one word" in q:
-        parsed_filters["word_count"] = 1
-    if "longer than" in q:
-        try:
-            num = int(q.split("longer than")[1].split()[0])
-            parsed_filters["min_length"] = num + 1
-        except Exception:
-            pass
-    if "contain" in q:
-        for ch in "abcdefghijklmnopqrstuvwxyz":
-            if f" {ch}" in q:
-                parsed_filters["contains_character"] = ch
-                break
+    for match in _NL_QUERY_RE.finditer(q):
+        if match.group("palindrome"):
+            parsed_filters["is_palindrome"] = True
+        elif match.group("single_word"):
+            parsed_filters["word_count"] = 1
+        elif match.group("longer_than"):
+            parsed_filters.setdefault("min_length", int(match.group("longer_than")) + 1)
+        elif match.group("character"):
+            parsed_filters.setdefault("contains_character", match.group("character"))
 
     if not parsed_filters:
         return jsonify({"error": "Unable to parse natural language query"}), 400
@@ -231,18 +545,15 @@ def filter_by_natural_language():
     if "min_length" in parsed_filters:
         query = query.filter(StringRecord.length >= parsed_filters["min_length"])
     if "contains_character" in parsed_filters:
-        query = query.filter(StringRecord.value.contains(parsed_filters["contains_character"]))
+        query = query.filter(contains_character_filter(parsed_filters["contains_character"]))
 
-    results = query.all()
-    data = [r.to_dict() for r in results]
+    include_frequency_map = wants_frequency_map()
+    if not include_frequency_map:
+        query = query.options(defer(StringRecord.character_frequency_map))
 
-    return jsonify({
-        "data": data,
-        "count": len(data),
-        "interpreted_query": {
-            "original": query_text,
-            "parsed_filters": parsed_filters
-        }
+    return stream_records(query.yield_per(500), include_frequency_map, interpreted_query={
+        "original": query_text,
+        "parsed_filters": parsed_filters
     }), 200
 
 